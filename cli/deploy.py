@@ -1,10 +1,19 @@
 import os
 import json
 import subprocess
+import tarfile
 import time
 from pathlib import Path
 import click
 import boto3
+from cli.image_report import (
+    IMAGE_BUDGET_MB, IMAGE_GROWTH_PCT, analyze_image, check_image_budget, get_largest_files,
+    previous_image_report
+)
+from cli.journal import (
+    load_journal, new_journal, save_journal, complete_phase, last_completed_phase, clear_journal,
+    source_fingerprint
+)
 
 AWS_REGION = "ap-south-1"
 AWS_PROFILE = "Priyesh"
@@ -33,11 +42,63 @@ def wait_for_service_active(cluster, service, region, profile):
     return False
 
 
+def get_primary_deployment(ecs, cluster, service):
+    res = ecs.describe_services(cluster=cluster, services=[service])
+    deployments = res["services"][0]["deployments"]
+    return next((d for d in deployments if d["status"] == "PRIMARY"), None)
+
+
+def get_image_id(image):
+    """Returns the local image ID, or None if the image is not present."""
+    try:
+        return subprocess.check_output(
+            ["docker", "image", "inspect", "--format", "{{.Id}}", image], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except subprocess.CalledProcessError:
+        return None
+
+
+def get_image_digest(image, registry):
+    """Returns the registry digest of a pushed image (e.g. sha256:...), or None if unknown."""
+    output = subprocess.check_output(
+        ["docker", "image", "inspect", "--format", "{{json .RepoDigests}}", image], text=True
+    )
+    repo_digest = next((d for d in json.loads(output) if d.startswith(f"{registry}/")), None)
+    return repo_digest.split("@", 1)[1] if repo_digest else None
+
+
+def wait_for_deployment_stable(ecs, cluster, service, deployment_id):
+    """
+    Waits until the given ECS deployment is stable. Returns immediately if ECS already
+    finished it, and returns False if it failed or was replaced by another deployment.
+    """
+    click.echo("---- Waiting for ECS Service to stabilize...")
+    while True:
+        primary = get_primary_deployment(ecs, cluster, service)
+        if not primary or primary["id"] != deployment_id:
+            click.echo(f"❌ Deployment {deployment_id} is no longer the PRIMARY deployment.")
+            return False
+        if primary.get("rolloutState") == "FAILED":
+            click.echo(f"❌ Deployment failed: {primary.get('rolloutStateReason', '')}")
+            return False
+        if primary["desiredCount"] == primary["runningCount"] and primary["pendingCount"] == 0:
+            click.echo("---- Service is stable.")
+            return True
+        click.echo(f"🔁 Running: {primary['runningCount']} / Desired: {primary['desiredCount']}")
+        time.sleep(5)
+
+
 @click.command(name='deploy')
 @click.option('--version', required=True, help='Image version to deploy (e.g. v1, v2)')
-def deploy_command(version):
+@click.option('--max-image-mb', default=IMAGE_BUDGET_MB, show_default=True, type=float, help='Absolute image size budget in MB')
+@click.option('--max-growth-pct', default=IMAGE_GROWTH_PCT, show_default=True, type=float, help='Allowed image growth vs the previous version, in %')
+@click.option('--on-budget-exceeded', type=click.Choice(['warn', 'fail']), default='warn', show_default=True, help='Warn or abort the deploy when the image budget is exceeded')
+@click.option('--largest-files/--no-largest-files', default=False, show_default=True, help='Always record the largest files in the image (otherwise only when the budget is exceeded)')
+@click.option('--resume', is_flag=True, help='Continue an interrupted deploy from its last completed phase')
+def deploy_command(version, max_image_mb, max_growth_pct, on_budget_exceeded, largest_files, resume):
     """
     Deploy Docker image to ECR and update ECS service with new Task Definition.
+    Completed phases are journaled so an interrupted deploy can be resumed.
     """
     try:
         session = boto3.Session(profile_name=AWS_PROFILE, region_name=AWS_REGION)
@@ -53,155 +114,248 @@ def deploy_command(version):
 
     image = f"{ecr_url}/{ENV}-frontend-ecr:{version}"
 
-    click.echo("---- Logging into ECR...")
-    try:
-        login_cmd = (
-            f"aws ecr get-login-password --region {AWS_REGION} --profile {AWS_PROFILE} | "
-            f"docker login --username AWS --password-stdin {ecr_url}"
-        )
-        subprocess.run(login_cmd, shell=True, check=True)
-    except subprocess.CalledProcessError:
-        click.echo("---- ECR login failed.")
-        return
+    # Pick up an interrupted deploy of the same version (and, unless --resume, the same source)
+    journal = load_journal()
+    if journal and journal["version"] != version:
+        journal = None
+    source = source_fingerprint()
+    if resume:
+        if not journal:
+            click.echo(f"❌ No interrupted deploy of '{version}' to resume.")
+            return
+        if journal["source"] != source and "build" in journal["phases"]:
+            click.echo("⚠️ Source changed since the interrupted deploy, resuming with the already built image.")
+    elif journal and journal["source"] == source:
+        click.echo(f"♻️ Found an interrupted deploy of '{version}' for the same source, reusing it.")
+    else:
+        journal = new_journal(version, source)
 
-    try:
-        click.echo(f"🐳 Building Docker image '{version}'...")
-        subprocess.run(["docker", "build", 
-                        "--no-cache", # this ensures every --version creates a new-fresh image to push to ECR
-                        "--pull","-t", image, 
-                        "."
-        ], check=True)
-
-        click.echo("---- Pushing to ECR...")
-        subprocess.run(["docker", "push", image], check=True)
-    except subprocess.CalledProcessError as e:
-        click.echo(f"❌ Docker build/push failed: {e}")
-        return
+    # A built but not yet pushed image is only reusable if it is still the local image
+    if "build" in journal["phases"] and "push" not in journal["phases"] \
+            and get_image_id(image) != journal["phases"]["build"]["image_id"]:
+        click.echo("---- Local image changed since the interrupted deploy, rebuilding.")
+        journal = new_journal(version, source)
+    phases = journal["phases"]
+
+    if phases:
+        click.echo(f"---- Resuming after phase '{last_completed_phase(journal)}'.")
+
+    if versionjson_path.exists():
+        with open(versionjson_path) as vf:
+            history = json.load(vf).get("history", [])
+    else:
+        history = []
+
+    if "push" not in phases:
+        click.echo("---- Logging into ECR...")
+        try:
+            login_cmd = (
+                f"aws ecr get-login-password --region {AWS_REGION} --profile {AWS_PROFILE} | "
+                f"docker login --username AWS --password-stdin {ecr_url}"
+            )
+            subprocess.run(login_cmd, shell=True, check=True)
+        except subprocess.CalledProcessError:
+            click.echo("---- ECR login failed.")
+            return
+
+    if "build" not in phases:
+        try:
+            click.echo(f"🐳 Building Docker image '{version}'...")
+            subprocess.run(["docker", "build", 
+                            "--no-cache", # this ensures every --version creates a new-fresh image to push to ECR
+                            "--pull","-t", image, 
+                            "."
+            ], check=True)
+        except subprocess.CalledProcessError as e:
+            click.echo(f"❌ Docker build/push failed: {e}")
+            return
+
+        click.echo("---- Analyzing image size...")
+        try:
+            image_report = analyze_image(image, largest_files=largest_files)
+        except (subprocess.CalledProcessError, ValueError, tarfile.TarError, OSError) as e:
+            click.echo(f"⚠️ Could not analyze image: {e}")
+            image_report = None
+
+        if image_report:
+            click.echo(f"---- Image size: {image_report['size'] / (1024 * 1024):.1f} MB "
+                       f"({len(image_report['layers'])} layers)")
+            violations = check_image_budget(image_report, previous_image_report(history), max_image_mb, max_growth_pct)
+            for violation in violations:
+                click.echo(f"{'❌' if on_budget_exceeded == 'fail' else '⚠️'} {violation}")
+
+            if violations:
+                # Only unpack the image to find what grew when it is over budget
+                if not image_report["largest_files"]:
+                    try:
+                        image_report["largest_files"] = get_largest_files(image)
+                    except (subprocess.CalledProcessError, tarfile.TarError, OSError) as e:
+                        click.echo(f"⚠️ Could not list largest files: {e}")
+                for f in image_report["largest_files"]:
+                    click.echo(f"  {f['size'] / (1024 * 1024):>8.1f} MB  {f['path']}")
+            if violations and on_budget_exceeded == "fail":
+                click.echo("---- Image budget exceeded, aborting deploy.")
+                return
+
+        complete_phase(journal, "build", image_id=get_image_id(image), image_report=image_report)
+
+    image_report = phases["build"]["image_report"]
+
+    if "push" not in phases:
+        try:
+            click.echo("---- Pushing to ECR...")
+            subprocess.run(["docker", "push", image], check=True)
+            digest = get_image_digest(image, ecr_url)
+        except subprocess.CalledProcessError as e:
+            click.echo(f"❌ Docker build/push failed: {e}")
+            return
+        complete_phase(journal, "push", image_digest=digest)
 
     task_family = f"{ENV}-frontend-task"
     cluster_name = f"{ENV}-ecs-cluster"
     service_name = f"{ENV}-frontend-service"
     execution_role_arn = f"arn:aws:iam::{account_id}:role/{ENV}-ecsTaskExecutionRole"
 
-    try:    
-        click.echo("---- Registering ECS Task Definition...")
-        response = ecs.register_task_definition(
-            family=task_family,
-            executionRoleArn=execution_role_arn,
-            networkMode="awsvpc",
-            requiresCompatibilities=["FARGATE"],
-            cpu="256",
-            memory="512",
-            # containerDefinitions=[]
-            containerDefinitions=[
-    {
-        "name": "frontend",
-        "image": image,
-        "essential": True,
-        "portMappings": [{"containerPort": 80}]
-    },
-    {
-        "name": "prometheus",
-        "image": "prom/prometheus:latest",
-        "portMappings": [{"containerPort": 9090}],
-        "logConfiguration": {
-            "logDriver": "awslogs",
-            "options": {
-                "awslogs-group": f"/ecs/{ENV}-frontend",
-                "awslogs-region": AWS_REGION,
-                "awslogs-stream-prefix": "ecs"
-            }
-        }
-    },
-    {
-        "name": "grafana",
-        "image": "grafana/grafana:latest",
-        "portMappings": [{"containerPort": 3000}],
-        "environment": [
-            {
-                "name": "GF_SECURITY_ADMIN_PASSWORD",
-                "value": "admin"
-            },
-            {
-                "name": "GF_SERVER_ROOT_URL",
-                "value": "%(protocol)s://%(domain)s/grafana/"
-            },
-            {
-                "name": "GF_SERVER_SERVE_FROM_SUB_PATH",
-                "value": "true"
+    # Pin the task definition to the pushed digest, so a resumed deploy cannot pick up
+    # a different image if the tag was pushed again in the meantime
+    digest = phases["push"]["image_digest"]
+    task_image = f"{ecr_url}/{ENV}-frontend-ecr@{digest}" if digest else image
+
+    if "register" not in phases:
+        try:
+            click.echo("---- Registering ECS Task Definition...")
+            response = ecs.register_task_definition(
+                family=task_family,
+                executionRoleArn=execution_role_arn,
+                networkMode="awsvpc",
+                requiresCompatibilities=["FARGATE"],
+                cpu="256",
+                memory="512",
+                # containerDefinitions=[]
+                containerDefinitions=[
+        {
+            "name": "frontend",
+            "image": task_image,
+            "essential": True,
+            "portMappings": [{"containerPort": 80}]
+        },
+        {
+            "name": "prometheus",
+            "image": "prom/prometheus:latest",
+            "portMappings": [{"containerPort": 9090}],
+            "logConfiguration": {
+                "logDriver": "awslogs",
+                "options": {
+                    "awslogs-group": f"/ecs/{ENV}-frontend",
+                    "awslogs-region": AWS_REGION,
+                    "awslogs-stream-prefix": "ecs"
+                }
             }
-        ],
-        "logConfiguration": {
-            "logDriver": "awslogs",
-            "options": {
-                "awslogs-group": f"/ecs/{ENV}-frontend",
-                "awslogs-region": AWS_REGION,
-                "awslogs-stream-prefix": "ecs"
+        },
+        {
+            "name": "grafana",
+            "image": "grafana/grafana:latest",
+            "portMappings": [{"containerPort": 3000}],
+            "environment": [
+                {
+                    "name": "GF_SECURITY_ADMIN_PASSWORD",
+                    "value": "admin"
+                },
+                {
+                    "name": "GF_SERVER_ROOT_URL",
+                    "value": "%(protocol)s://%(domain)s/grafana/"
+                },
+                {
+                    "name": "GF_SERVER_SERVE_FROM_SUB_PATH",
+                    "value": "true"
+                }
+            ],
+            "logConfiguration": {
+                "logDriver": "awslogs",
+                "options": {
+                    "awslogs-group": f"/ecs/{ENV}-frontend",
+                    "awslogs-region": AWS_REGION,
+                    "awslogs-stream-prefix": "ecs"
+                }
             }
         }
-    }
-]
-        )
-        task_def_arn = response["taskDefinition"]["taskDefinitionArn"]
-        revision = response["taskDefinition"]["revision"]
-        click.echo(f"✅ Task Definition Registered: {task_def_arn}")
-    except Exception as e:
-        click.echo(f"❌ Task definition failed: {e}")
-        return
-
-    try:
-        ecs.describe_services(cluster=cluster_name, services=[service_name])
-        
-        # 🔁 Wait until service becomes ACTIVE
-        if not wait_for_service_active(cluster_name, service_name, AWS_REGION, AWS_PROFILE):
-            return
-        
-        click.echo(f"🔄 Updating ECS Service '{service_name}'...")
-        ecs.update_service(
-            cluster=cluster_name,
-            service=service_name,
-            taskDefinition=task_def_arn,
-            forceNewDeployment=True
-        )
-    except ecs.exceptions.ClientError as e:
-        if "ServiceNotFoundException" in str(e):
-            click.echo(f"🆕 Creating ECS Service '{service_name}'...")
-            click.echo("---- Missing create-service logic. Add subnet, sg, alb_target_group manually if needed.")
-            return
-        else:
-            click.echo(f"❌ Failed to update/create ECS service: {e}")
+    ]
+            )
+            task_def_arn = response["taskDefinition"]["taskDefinitionArn"]
+            revision = response["taskDefinition"]["revision"]
+            click.echo(f"✅ Task Definition Registered: {task_def_arn}")
+        except Exception as e:
+            click.echo(f"❌ Task definition failed: {e}")
             return
+        complete_phase(journal, "register", task_def_arn=task_def_arn, revision=revision)
 
-    click.echo("---- Waiting for ECS Service to stabilize...")
-    while True:
-        res = ecs.describe_services(cluster=cluster_name, services=[service_name])
-        deployments = res["services"][0]["deployments"]
-        primary = next((d for d in deployments if d["status"] == "PRIMARY"), None)
-        if primary and primary["desiredCount"] == primary["runningCount"] and primary["pendingCount"] == 0:
-            click.echo("---- Service is stable.")
-            break
-        click.echo(f"🔁 Running: {primary['runningCount']} / Desired: {primary['desiredCount']}")
-        time.sleep(5)
+    task_def_arn = phases["register"]["task_def_arn"]
+    revision = phases["register"]["revision"]
+
+    if "update_service" not in phases:
+        try:
+            primary = get_primary_deployment(ecs, cluster_name, service_name)
+
+            if primary and primary["taskDefinition"] == task_def_arn and primary.get("rolloutState") != "FAILED":
+                # The service was already updated before the previous run was interrupted
+                click.echo(f"---- ECS Service '{service_name}' is already on {task_def_arn}.")
+                deployment_id = primary["id"]
+            else:
+                # 🔁 Wait until service becomes ACTIVE
+                if not wait_for_service_active(cluster_name, service_name, AWS_REGION, AWS_PROFILE):
+                    return
+
+                click.echo(f"🔄 Updating ECS Service '{service_name}'...")
+                response = ecs.update_service(
+                    cluster=cluster_name,
+                    service=service_name,
+                    taskDefinition=task_def_arn,
+                    forceNewDeployment=True
+                )
+                deployments = response["service"]["deployments"]
+                deployment_id = next(d["id"] for d in deployments if d["status"] == "PRIMARY")
+        except ecs.exceptions.ClientError as e:
+            if "ServiceNotFoundException" in str(e):
+                click.echo(f"🆕 Creating ECS Service '{service_name}'...")
+                click.echo("---- Missing create-service logic. Add subnet, sg, alb_target_group manually if needed.")
+                return
+            else:
+                click.echo(f"❌ Failed to update/create ECS service: {e}")
+                return
+        complete_phase(journal, "update_service", deployment_id=deployment_id)
+
+    if "stable" not in phases:
+        if not wait_for_deployment_stable(ecs, cluster_name, service_name, phases["update_service"]["deployment_id"]):
+            # Forget the dead deployment so the next run starts a new rollout of the same task definition
+            del phases["update_service"]
+            save_journal(journal)
+            click.echo("---- Rerun 'deploy' (or 'deploy --resume') to roll out the registered task definition again.")
+            return
+        complete_phase(journal, "stable")
 
     version_entry = {
         "version": version,
-        "revision": revision
+        "revision": revision,
+        "image_digest": digest
     }
-    if versionjson_path.exists():
-        with open(versionjson_path) as vf:
-            version_data = json.load(vf)
-            history = version_data.get("history", [])
+    if image_report:
+        version_entry["image"] = image_report
+
+    # A previous run may have written version.json and been stopped before clearing the journal
+    if history and history[-1]["version"] == version and history[-1]["revision"] == revision:
+        click.echo(f"---- '{version}' (revision {revision}) is already recorded in version.json.")
     else:
-        history = []
+        history = history + [version_entry]
 
     version_data = {
         "latest_version": version,
-        "history": history + [version_entry]
+        "history": history
     }
 
     with open(versionjson_path, "w") as vf:
         json.dump(version_data, vf, indent=2)
 
+    clear_journal()
     click.echo("---- version.json updated.")
 
     try:
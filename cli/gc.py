@@ -0,0 +1,236 @@
+import json
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import click
+import boto3
+from cli.journal import load_journal
+
+AWS_REGION = "ap-south-1"
+AWS_PROFILE = "Priyesh"
+ENV = "dev"
+versionjson_path = Path("C:/Users/Minfy/Desktop/frontend-deployer-cli/version.json")
+
+# ECR accepts at most 100 image ids per batch_get_image / batch_delete_image call
+ECR_BATCH_SIZE = 100
+
+INDEX_MEDIA_TYPES = [
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+]
+MANIFEST_MEDIA_TYPES = [
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+]
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def get_task_definition_images(ecs, task_definition, repository):
+    """Returns (revision, image tags, image digests) of the repository images a task definition uses."""
+    tags, digests = set(), set()
+    task_def = ecs.describe_task_definition(taskDefinition=task_definition)["taskDefinition"]
+    for container in task_def["containerDefinitions"]:
+        image = container["image"]
+        if f"/{repository}@" in image:
+            digests.add(image.rsplit("@", 1)[1])
+        elif f"/{repository}:" in image:
+            tags.add(image.rsplit(":", 1)[1])
+    return task_def["revision"], tags, digests
+
+
+def get_running_references(ecs, cluster, service, repository):
+    """Returns (revisions, image tags, image digests) used by the deployments currently on the ECS service."""
+    revisions, tags, digests = set(), set(), set()
+    res = ecs.describe_services(cluster=cluster, services=[service])
+    for svc in res.get("services", []):
+        for deployment in svc.get("deployments", []):
+            revision, task_tags, task_digests = get_task_definition_images(
+                ecs, deployment["taskDefinition"], repository
+            )
+            revisions.add(revision)
+            tags |= task_tags
+            digests |= task_digests
+    return revisions, tags, digests
+
+
+def select_kept_history(history, keep, extra_revisions=(), extra_tags=()):
+    """Returns the last `keep` history entries plus any entry whose revision or tag must stay."""
+    first_kept = len(history) - keep
+    return [
+        entry for i, entry in enumerate(history)
+        if i >= first_kept or entry["revision"] in extra_revisions or entry["version"] in extra_tags
+    ]
+
+
+def get_kept_digests(ecr, repository, keep_tags, keep_digests=()):
+    """
+    Returns the digests of the kept images, plus the platform and attestation manifests
+    their image indexes point to (those are listed in ECR as untagged images).
+    """
+    digests = set(keep_digests)
+    image_ids = [{"imageTag": tag} for tag in sorted(keep_tags)]
+    image_ids += [{"imageDigest": digest} for digest in sorted(keep_digests)]
+    for batch in _chunks(image_ids, ECR_BATCH_SIZE):
+        res = ecr.batch_get_image(
+            repositoryName=repository,
+            imageIds=batch,
+            acceptedMediaTypes=INDEX_MEDIA_TYPES + MANIFEST_MEDIA_TYPES
+        )
+        for image in res["images"]:
+            digests.add(image["imageId"]["imageDigest"])
+            manifest = json.loads(image["imageManifest"])
+            for child in manifest.get("manifests", []):
+                digests.add(child["digest"])
+    return digests
+
+
+def list_stale_task_definitions(ecs, family, keep_revisions):
+    """Returns ACTIVE task definition ARNs of the family whose revision is not referenced."""
+    stale = []
+    paginator = ecs.get_paginator("list_task_definitions")
+    for page in paginator.paginate(familyPrefix=family, status="ACTIVE"):
+        for arn in page["taskDefinitionArns"]:
+            if int(arn.rsplit(":", 1)[1]) not in keep_revisions:
+                stale.append(arn)
+    return stale
+
+
+def list_stale_images(ecr, repository, keep_tags, keep_digests):
+    """Returns ECR image ids that are neither a kept tag nor a manifest a kept tag depends on."""
+    stale = []
+    paginator = ecr.get_paginator("list_images")
+    for page in paginator.paginate(repositoryName=repository):
+        for image_id in page["imageIds"]:
+            if image_id.get("imageTag") in keep_tags or image_id["imageDigest"] in keep_digests:
+                continue
+            stale.append(image_id)
+    return stale
+
+
+@click.command(name='gc')
+@click.option('--keep', required=True, type=click.IntRange(min=1), help='Number of most recent deployments to keep')
+@click.option('--dry-run', is_flag=True, help='Only show what would be removed')
+@click.option('--concurrency', default=4, show_default=True, type=click.IntRange(min=1), help='Max parallel AWS delete calls')
+def gc_command(keep, dry_run, concurrency):
+    """
+    Deregister old ECS task definition revisions and delete unreferenced ECR images.
+    """
+    try:
+        session = boto3.Session(profile_name=AWS_PROFILE, region_name=AWS_REGION)
+        ecs = session.client("ecs")
+        ecr = session.client("ecr")
+    except Exception as e:
+        click.echo(f"❌ Failed to authenticate AWS session: {e}")
+        return
+
+    if not versionjson_path.exists():
+        click.echo("---- version.json not found.")
+        return
+
+    with open(versionjson_path) as vf:
+        version_data = json.load(vf)
+    history = version_data.get("history", [])
+    kept = select_kept_history(history, keep)
+
+    task_family = f"{ENV}-frontend-task"
+    cluster_name = f"{ENV}-ecs-cluster"
+    service_name = f"{ENV}-frontend-service"
+    repository = f"{ENV}-frontend-ecr"
+
+    keep_revisions = {entry["revision"] for entry in kept}
+    keep_tags = {entry["version"] for entry in kept}
+    keep_digests = set()
+
+    # An interrupted deploy still needs its pushed image and registered task definition to resume
+    journal = load_journal()
+    if journal:
+        keep_tags.add(journal["version"])
+        if journal["phases"].get("push", {}).get("image_digest"):
+            keep_digests.add(journal["phases"]["push"]["image_digest"])
+        if "register" in journal["phases"]:
+            keep_revisions.add(journal["phases"]["register"]["revision"])
+
+    try:
+        running_revisions, running_tags, running_digests = get_running_references(
+            ecs, cluster_name, service_name, repository
+        )
+        keep_revisions |= running_revisions
+        keep_tags |= running_tags
+        keep_digests |= running_digests
+
+        # Entries still running on the service stay in the history so they can be rolled back to
+        kept = select_kept_history(history, keep, running_revisions)
+
+        # Redeploying a version moves its tag, so older kept entries are only safe by digest.
+        # Entries recorded before digests were stored fall back to their task definition.
+        for entry in kept:
+            if entry.get("image_digest"):
+                keep_digests.add(entry["image_digest"])
+            else:
+                _, task_tags, task_digests = get_task_definition_images(
+                    ecs, f"{task_family}:{entry['revision']}", repository
+                )
+                keep_tags |= task_tags
+                keep_digests |= task_digests
+
+        stale_task_defs = list_stale_task_definitions(ecs, task_family, keep_revisions)
+        keep_digests = get_kept_digests(ecr, repository, keep_tags, keep_digests)
+        stale_images = list_stale_images(ecr, repository, keep_tags, keep_digests)
+    except Exception as e:
+        click.echo(f"❌ Failed to collect references: {e}")
+        return
+
+    click.echo(f"---- Keeping revisions: {sorted(keep_revisions)}")
+    click.echo(f"---- Keeping image tags: {sorted(keep_tags)}")
+    click.echo(f"---- {len(stale_task_defs)} task definition revision(s) to deregister.")
+    click.echo(f"---- {len(stale_images)} ECR image(s) to delete.")
+
+    if dry_run:
+        for arn in stale_task_defs:
+            click.echo(f"  [dry-run] deregister {arn}")
+        for image_id in stale_images:
+            click.echo(f"  [dry-run] delete {image_id.get('imageTag', image_id['imageDigest'])}")
+        click.echo(f"  [dry-run] version.json would keep {len(kept)} of {len(history)} entries")
+        return
+
+    failed_revisions, failed_tags = set(), set()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        task_def_futures = {
+            pool.submit(ecs.deregister_task_definition, taskDefinition=arn): arn for arn in stale_task_defs
+        }
+        image_futures = [
+            (pool.submit(ecr.batch_delete_image, repositoryName=repository, imageIds=batch), batch)
+            for batch in _chunks(stale_images, ECR_BATCH_SIZE)
+        ]
+
+        for future, arn in task_def_futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                failed_revisions.add(int(arn.rsplit(":", 1)[1]))
+                click.echo(f"❌ Failed to deregister {arn}: {e}")
+
+        for future, batch in image_futures:
+            try:
+                for failure in future.result().get("failures", []):
+                    failed_tags.add(failure["imageId"].get("imageTag"))
+                    click.echo(f"❌ Failed to delete image {failure['imageId']}: {failure['failureReason']}")
+            except Exception as e:
+                failed_tags.update(image_id.get("imageTag") for image_id in batch)
+                click.echo(f"❌ ECR batch delete failed: {e}")
+
+    failed = bool(failed_revisions or failed_tags)
+    # Entries whose revision or image could not be removed stay, so the history matches AWS
+    kept = select_kept_history(history, keep, running_revisions | failed_revisions, failed_tags)
+    version_data["history"] = kept
+    with open(versionjson_path, "w") as vf:
+        json.dump(version_data, vf, indent=2)
+
+    click.echo(f"---- version.json compacted to {len(kept)} entries.")
+    if failed:
+        click.echo("⚠️ Garbage collection finished with errors.")
+    else:
+        click.echo("✅ Garbage collection complete.")
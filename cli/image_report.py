@@ -0,0 +1,156 @@
+import json
+import tarfile
+import subprocess
+from pathlib import Path
+import click
+
+versionjson_path = Path("C:/Users/Minfy/Desktop/frontend-deployer-cli/version.json")
+
+# Default budgets for the built image (can be overridden on 'deploy')
+IMAGE_BUDGET_MB = 500
+IMAGE_GROWTH_PCT = 20
+LARGEST_FILES_COUNT = 10
+
+
+def _mb(size_bytes):
+    return size_bytes / (1024 * 1024)
+
+
+def get_image_layers(image):
+    """Returns per-layer sizes (in bytes) from 'docker history', oldest layer first."""
+    output = subprocess.check_output([
+        "docker", "history", "--no-trunc", "--human=false",
+        "--format", "{{json .}}", image
+    ], text=True)
+
+    layers = []
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        layers.append({
+            "size": int(entry.get("Size", 0)),
+            "created_by": entry.get("CreatedBy", "")
+        })
+    # docker history lists the newest layer first
+    layers.reverse()
+    return layers
+
+
+def get_largest_files(image, count=LARGEST_FILES_COUNT):
+    """Streams 'docker save' and returns the largest files added across all image layers."""
+    files = []
+    proc = subprocess.Popen(["docker", "save", image], stdout=subprocess.PIPE)
+    try:
+        with tarfile.open(fileobj=proc.stdout, mode="r|") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                # Layer blobs are 'layer.tar' (legacy) or 'blobs/sha256/..' (OCI)
+                if not (member.name.endswith("layer.tar") or member.name.startswith("blobs/")):
+                    continue
+                layer_file = archive.extractfile(member)
+                try:
+                    with tarfile.open(fileobj=layer_file, mode="r|*") as layer:
+                        for entry in layer:
+                            if entry.isfile():
+                                files.append({"path": "/" + entry.name.removeprefix("./"), "size": entry.size})
+                except tarfile.ReadError:
+                    # OCI blobs also contain the config/manifest json, skip those
+                    continue
+                files = sorted(files, key=lambda f: f["size"], reverse=True)[:count]
+    finally:
+        proc.stdout.close()
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, ["docker", "save", image])
+    return files
+
+
+def analyze_image(image, largest_files=False):
+    """
+    Collects total size and per-layer sizes of a locally built image. The largest files
+    are only collected when asked for, since that streams and unpacks the whole image.
+    """
+    size = subprocess.check_output(
+        ["docker", "image", "inspect", "--format", "{{.Size}}", image], text=True
+    ).strip()
+    return {
+        "size": int(size),
+        "layers": get_image_layers(image),
+        "largest_files": get_largest_files(image) if largest_files else []
+    }
+
+
+def previous_image_report(history):
+    """Returns the image report of the most recent deployment that recorded one."""
+    for entry in reversed(history):
+        if entry.get("image"):
+            return entry["image"]
+    return None
+
+
+def check_image_budget(report, previous, max_mb, max_growth_pct):
+    """Returns a list of budget violations (empty if the image is within budget)."""
+    violations = []
+    size_mb = _mb(report["size"])
+    if max_mb is not None and size_mb > max_mb:
+        violations.append(f"Image is {size_mb:.1f} MB, budget is {max_mb} MB")
+
+    if previous and max_growth_pct is not None and previous.get("size"):
+        growth = (report["size"] - previous["size"]) * 100 / previous["size"]
+        if growth > max_growth_pct:
+            violations.append(
+                f"Image grew {growth:.1f}% ({_mb(previous['size']):.1f} MB -> {size_mb:.1f} MB), "
+                f"allowed growth is {max_growth_pct}%"
+            )
+    return violations
+
+
+@click.command(name='image-report')
+@click.argument('version')
+def image_report_command(version):
+    """
+    Shows image size trend across deployed versions up to VERSION, with its layer breakdown.
+    """
+    if not versionjson_path.exists():
+        click.echo("---- version.json not found.")
+        return
+
+    with open(versionjson_path) as vf:
+        history = json.load(vf).get("history", [])
+
+    index = next((i for i in range(len(history) - 1, -1, -1) if history[i]["version"] == version), None)
+    if index is None:
+        click.echo(f"❌ Version '{version}' not found in version.json.")
+        return
+
+    click.echo("---- Image size trend:")
+    previous_size = None
+    for entry in history[:index + 1]:
+        image = entry.get("image")
+        if not image:
+            click.echo(f"  {entry['version']:<10} (no image data)")
+            continue
+        line = f"  {entry['version']:<10} {_mb(image['size']):>8.1f} MB"
+        if previous_size:
+            growth = (image["size"] - previous_size) * 100 / previous_size
+            line += f"  ({growth:+.1f}%)"
+        click.echo(line)
+        previous_size = image["size"]
+
+    image = history[index].get("image")
+    if not image:
+        click.echo(f"---- No image data recorded for '{version}'.")
+        return
+
+    click.echo(f"---- Layers of '{version}':")
+    for layer in image["layers"]:
+        click.echo(f"  {_mb(layer['size']):>8.1f} MB  {layer['created_by'][:80]}")
+
+    if not image["largest_files"]:
+        click.echo(f"---- Largest files were not collected for '{version}'.")
+        return
+
+    click.echo(f"---- Largest files in '{version}':")
+    for f in image["largest_files"]:
+        click.echo(f"  {_mb(f['size']):>8.1f} MB  {f['path']}")
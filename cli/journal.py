@@ -0,0 +1,133 @@
+import os
+import json
+import stat
+import fnmatch
+import hashlib
+from pathlib import Path
+import click
+
+# Journals of completed deploy phases, one per project. Kept outside the project so
+# they never end up in the docker build context.
+JOURNAL_DIR = Path.home() / ".deploy-tool"
+
+# Phases of a deploy, in the order they complete
+PHASES = ["build", "push", "register", "update_service", "stable"]
+
+
+def journal_path():
+    """Returns the journal file of the project in the current directory."""
+    project = hashlib.sha256(str(Path.cwd().resolve()).encode()).hexdigest()[:16]
+    return JOURNAL_DIR / f"journal-{project}.json"
+
+
+def _dockerignore_patterns(root):
+    """Returns (pattern, negated) pairs from the project's .dockerignore."""
+    try:
+        lines = (Path(root) / ".dockerignore").read_text().splitlines()
+    except OSError:
+        return []
+
+    patterns = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        pattern = line[1:].strip() if negated else line
+        pattern = os.path.normpath(pattern.strip("/")).replace(os.sep, "/")
+        patterns.append((pattern, negated))
+    return patterns
+
+
+def _is_ignored(rel_path, patterns):
+    # Like docker, a pattern matching a parent directory excludes everything in it,
+    # and the last matching pattern wins
+    parts = rel_path.split("/")
+    ignored = False
+    for pattern, negated in patterns:
+        if any(fnmatch.fnmatchcase("/".join(parts[:i]), pattern) for i in range(1, len(parts) + 1)):
+            ignored = not negated
+    return ignored
+
+
+def source_fingerprint(root="."):
+    """
+    Returns a sha256 over the path, size and mtime of every file in the docker build
+    context (honouring .dockerignore). Only stats files, so it is cheap on large projects.
+    """
+    patterns = _dockerignore_patterns(root)
+    can_prune = not any(negated for _, negated in patterns)
+    digest = hashlib.sha256()
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        rel_dir = "" if rel_dir == "." else rel_dir + "/"
+        if can_prune:
+            dirnames[:] = [d for d in dirnames if not _is_ignored(rel_dir + d, patterns)]
+        dirnames.sort()
+
+        for name in sorted(filenames):
+            rel_path = rel_dir + name
+            if _is_ignored(rel_path, patterns):
+                continue
+            try:
+                info = os.lstat(os.path.join(dirpath, name))
+                if stat.S_ISLNK(info.st_mode):
+                    entry = f"{rel_path} -> {os.readlink(os.path.join(dirpath, name))}"
+                elif stat.S_ISREG(info.st_mode):
+                    entry = f"{rel_path} {info.st_size} {info.st_mtime_ns}"
+                else:
+                    # sockets, fifos etc. are not sent to the docker daemon
+                    continue
+            except OSError:
+                continue
+            digest.update(entry.encode() + b"\0")
+    return digest.hexdigest()
+
+
+def load_journal():
+    """Returns the saved journal, or None if there is no (readable) partial deploy."""
+    path = journal_path()
+    if not path.exists():
+        return None
+    try:
+        with open(path) as f:
+            journal = json.load(f)
+    except (OSError, ValueError) as e:
+        click.echo(f"⚠️ Ignoring unreadable deploy journal {path}: {e}")
+        return None
+    if not isinstance(journal, dict) or not isinstance(journal.get("phases"), dict):
+        click.echo(f"⚠️ Ignoring malformed deploy journal {path}")
+        return None
+    return journal
+
+
+def new_journal(version, source):
+    return {"version": version, "source": source, "phases": {}}
+
+
+def save_journal(journal):
+    """Writes the journal atomically, so an interrupted write never leaves a truncated file."""
+    path = journal_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(journal, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def complete_phase(journal, phase, **artifacts):
+    """Records a finished phase with its artifacts and saves the journal to disk."""
+    journal["phases"][phase] = artifacts
+    save_journal(journal)
+
+
+def last_completed_phase(journal):
+    done = [phase for phase in PHASES if phase in journal["phases"]]
+    return done[-1] if done else None
+
+
+def clear_journal():
+    journal_path().unlink(missing_ok=True)
@@ -10,6 +10,8 @@ from cli.rollback import rollback_command
 # from cli.clone import clone_command
 # from cli.status import display_command
 from cli.monitoring import setup_monitoring_command
+from cli.image_report import image_report_command
+from cli.gc import gc_command
 
 @click.group()
 def cli():
@@ -25,6 +27,8 @@ cli.add_command(rollback_command)
 # cli.add_command(display_command)
 # cli.add_command(clone_command)
 cli.add_command(setup_monitoring_command)
+cli.add_command(image_report_command)
+cli.add_command(gc_command)
 
 if __name__ == '__main__':
     cli()
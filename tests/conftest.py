@@ -0,0 +1,99 @@
+import io
+import os
+import json
+import sys
+import tarfile
+import pytest
+
+from cli import journal
+
+FAKE_DOCKER = """#!{python}
+import json, sys
+from pathlib import Path
+
+state_dir = Path(__file__).parent
+state = json.loads((state_dir / "state.json").read_text())
+args = sys.argv[1:]
+with open(state_dir / "calls.log", "a") as log:
+    log.write(" ".join(args) + "\\n")
+
+if args[:2] == ["image", "inspect"]:
+    fmt = args[args.index("--format") + 1]
+    if "Id" in fmt:
+        print(state["id"])
+    elif "RepoDigests" in fmt:
+        print(json.dumps(state["repo_digests"]))
+    else:
+        print(state["size"])
+elif args[0] == "history":
+    for layer in state["history"]:
+        print(json.dumps(layer))
+elif args[0] == "save":
+    sys.stdout.buffer.write((state_dir / "save.tar").read_bytes())
+"""
+
+
+def _tar(files):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+class FakeDocker:
+    """A 'docker' executable on PATH that answers from a state file and logs its calls."""
+
+    def __init__(self, bin_dir):
+        self.bin_dir = bin_dir
+        self.state = {
+            "id": "sha256:imageid",
+            "size": 50 * 1024 * 1024,
+            "repo_digests": [],
+            "history": [
+                {"Size": "300", "CreatedBy": "COPY . ."},
+                {"Size": "1000", "CreatedBy": "FROM nginx:alpine"},
+            ],
+        }
+        self.set_layers([{"./usr/share/nginx/html/app.js": b"x" * 2048, "./etc/nginx.conf": b"y" * 10}])
+
+    def set_layers(self, layers):
+        """Builds a 'docker save' archive with one layer.tar per dict of {path: content}."""
+        archive = {f"layer{i}/layer.tar": _tar(files) for i, files in enumerate(layers)}
+        archive["manifest.json"] = b"[]"
+        (self.bin_dir / "save.tar").write_bytes(_tar(archive))
+
+    def save(self):
+        (self.bin_dir / "state.json").write_text(json.dumps(self.state))
+
+    @property
+    def calls(self):
+        log = self.bin_dir / "calls.log"
+        return log.read_text().splitlines() if log.exists() else []
+
+
+@pytest.fixture(autouse=True)
+def journal_dir(tmp_path, monkeypatch):
+    """Keeps deploy journals out of the real home directory."""
+    path = tmp_path / "journals"
+    monkeypatch.setattr(journal, "JOURNAL_DIR", path)
+    return path
+
+
+@pytest.fixture
+def fake_docker(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "docker"
+    script.write_text(FAKE_DOCKER.format(python=sys.executable))
+    script.chmod(0o755)
+    # 'aws ecr get-login-password' is piped into 'docker login'
+    aws = bin_dir / "aws"
+    aws.write_text("#!/bin/sh\necho password\n")
+    aws.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+    docker = FakeDocker(bin_dir)
+    docker.save()
+    return docker
@@ -0,0 +1,196 @@
+import json
+from unittest import mock
+import pytest
+from click.testing import CliRunner
+
+from cli import deploy
+from cli.journal import load_journal, new_journal, complete_phase
+
+REGISTRY = "123.dkr.ecr.ap-south-1.amazonaws.com"
+IMAGE = f"{REGISTRY}/dev-frontend-ecr:v9"
+
+
+class FakeECS:
+    """Just enough of the ECS API for deploy: one service and a task definition counter."""
+
+    def __init__(self):
+        self.revision = 29
+        self.deployments = [self._deployment("ecs-svc/old", 29)]
+        self.registered = []
+        self.updates = []
+        # queued callables run on describe_services before the regular answer
+        self.describe_hooks = []
+        self.exceptions = mock.Mock(ClientError=RuntimeError)
+
+    @staticmethod
+    def _deployment(deployment_id, revision, running=1):
+        return {
+            "id": deployment_id, "status": "PRIMARY", "taskDefinition": f"arn:td/dev-frontend-task:{revision}",
+            "desiredCount": 1, "runningCount": running, "pendingCount": 0, "rolloutState": "COMPLETED",
+        }
+
+    def register_task_definition(self, **kwargs):
+        self.revision += 1
+        self.registered.append(kwargs)
+        return {"taskDefinition": {
+            "taskDefinitionArn": f"arn:td/dev-frontend-task:{self.revision}", "revision": self.revision
+        }}
+
+    def update_service(self, taskDefinition, **kwargs):
+        self.updates.append(taskDefinition)
+        revision = int(taskDefinition.rsplit(":", 1)[1])
+        self.deployments = [self._deployment(f"ecs-svc/{len(self.updates)}", revision)]
+        return {"service": {"deployments": self.deployments}}
+
+    def describe_services(self, **kwargs):
+        if self.describe_hooks:
+            self.describe_hooks.pop(0)()
+        return {"services": [{"status": "ACTIVE", "deployments": self.deployments}]}
+
+
+@pytest.fixture
+def run_deploy(tmp_path, monkeypatch, fake_docker):
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "index.html").write_text("<h1>hi</h1>")
+    monkeypatch.chdir(project)
+
+    versionjson = tmp_path / "version.json"
+    monkeypatch.setattr(deploy, "versionjson_path", versionjson)
+    monkeypatch.setattr(deploy.time, "sleep", lambda seconds: None)
+
+    fake_docker.state["repo_digests"] = [f"{REGISTRY}/dev-frontend-ecr@sha256:pushed"]
+    fake_docker.save()
+
+    ecs = FakeECS()
+    sts = mock.Mock()
+    sts.get_caller_identity.return_value = {"Account": "123"}
+    session = mock.Mock()
+    session.client.side_effect = lambda name: {"ecs": ecs, "sts": sts}.get(name, mock.Mock())
+
+    def run(*args):
+        with mock.patch("boto3.Session", return_value=session):
+            return CliRunner().invoke(deploy.deploy_command, ["--version", "v9", *args])
+
+    run.ecs = ecs
+    run.docker = fake_docker
+    run.history = lambda: json.loads(versionjson.read_text())["history"]
+    return run
+
+
+def _builds(docker):
+    return [call for call in docker.calls if call.startswith("build")]
+
+
+def test_deploy_pins_task_definition_to_pushed_digest(run_deploy):
+    result = run_deploy()
+
+    assert result.exit_code == 0, result.output
+    image = run_deploy.ecs.registered[0]["containerDefinitions"][0]["image"]
+    assert image == f"{REGISTRY}/dev-frontend-ecr@sha256:pushed"
+    assert run_deploy.history()[-1]["revision"] == 30
+    assert run_deploy.history()[-1]["image_digest"] == "sha256:pushed"
+    assert load_journal() is None
+
+
+def test_interrupted_deploy_is_reused_without_rebuilding(run_deploy):
+    def network_down():
+        raise ConnectionError("network down")
+
+    # describe_services: update_service check, wait for ACTIVE, then the stabilization poll fails
+    run_deploy.ecs.describe_hooks = [lambda: None, lambda: None, network_down]
+
+    result = run_deploy()
+    assert isinstance(result.exception, ConnectionError)
+    assert load_journal()["phases"]["update_service"] == {"deployment_id": "ecs-svc/1"}
+
+    result = run_deploy()
+
+    assert result.exit_code == 0, result.output
+    assert "Resuming after phase 'update_service'" in result.output
+    assert len(_builds(run_deploy.docker)) == 1
+    assert len(run_deploy.ecs.registered) == 1
+    assert run_deploy.ecs.updates == ["arn:td/dev-frontend-task:30"]
+    assert load_journal() is None
+
+
+def test_failed_rollout_is_retried_on_next_run(run_deploy):
+    ecs = run_deploy.ecs
+
+    def circuit_breaker_rollback():
+        ecs.deployments = [ecs._deployment("ecs-svc/rollback", 29)]
+
+    ecs.describe_hooks = [lambda: None, lambda: None, circuit_breaker_rollback]
+
+    result = run_deploy()
+    assert "no longer the PRIMARY deployment" in result.output
+    assert "update_service" not in load_journal()["phases"]
+
+    result = run_deploy("--resume")
+
+    assert result.exit_code == 0, result.output
+    assert ecs.updates == ["arn:td/dev-frontend-task:30", "arn:td/dev-frontend-task:30"]
+    assert len(_builds(run_deploy.docker)) == 1
+    assert run_deploy.history()[-1]["revision"] == 30
+
+
+def test_failed_rollout_without_rollback_is_retried(run_deploy):
+    ecs = run_deploy.ecs
+
+    def rollout_failed():
+        # no circuit breaker rollback: the FAILED deployment stays PRIMARY
+        ecs.deployments[0]["rolloutState"] = "FAILED"
+
+    ecs.describe_hooks = [lambda: None, lambda: None, rollout_failed]
+
+    result = run_deploy()
+    assert "Deployment failed" in result.output
+    assert "update_service" not in load_journal()["phases"]
+
+    result = run_deploy("--resume")
+
+    assert result.exit_code == 0, result.output
+    assert "already on" not in result.output
+    assert ecs.updates == ["arn:td/dev-frontend-task:30", "arn:td/dev-frontend-task:30"]
+    assert run_deploy.history()[-1]["revision"] == 30
+
+
+def test_recorded_deploy_is_not_appended_twice(run_deploy, tmp_path):
+    journal = new_journal("v9", "src")
+    complete_phase(journal, "build", image_id="sha256:imageid", image_report=None)
+    complete_phase(journal, "push", image_digest="sha256:pushed")
+    complete_phase(journal, "register", task_def_arn="arn:td/dev-frontend-task:30", revision=30)
+    complete_phase(journal, "update_service", deployment_id="ecs-svc/1")
+    complete_phase(journal, "stable")
+    entry = {"version": "v9", "revision": 30, "image_digest": "sha256:pushed"}
+    (tmp_path / "version.json").write_text(json.dumps({"latest_version": "v9", "history": [entry]}))
+
+    result = run_deploy("--resume")
+
+    assert result.exit_code == 0, result.output
+    assert "already recorded" in result.output
+    assert run_deploy.history() == [entry]
+    assert load_journal() is None
+
+
+def test_stale_unpushed_build_starts_a_new_journal(run_deploy):
+    journal = new_journal("v9", "old-source")
+    complete_phase(journal, "build", image_id="sha256:something-else", image_report=None)
+
+    result = run_deploy("--resume")
+
+    assert result.exit_code == 0, result.output
+    assert "Local image changed" in result.output
+    assert len(_builds(run_deploy.docker)) == 1
+
+
+def test_source_change_starts_fresh_deploy(run_deploy):
+    journal = new_journal("v9", "old-source")
+    complete_phase(journal, "build", image_id="sha256:imageid", image_report=None)
+    complete_phase(journal, "push", image_digest="sha256:old")
+
+    result = run_deploy()
+
+    assert result.exit_code == 0, result.output
+    assert len(_builds(run_deploy.docker)) == 1
+
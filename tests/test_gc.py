@@ -0,0 +1,221 @@
+import json
+from unittest import mock
+import pytest
+from click.testing import CliRunner
+
+from cli import gc
+from cli.journal import complete_phase, new_journal
+from cli.gc import get_kept_digests, list_stale_images, select_kept_history
+
+REGISTRY = "123.dkr.ecr.ap-south-1.amazonaws.com"
+HISTORY = [{"version": f"v{i}", "revision": 10 + i} for i in range(1, 6)]
+
+
+class Paginator:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def paginate(self, **kwargs):
+        return self.pages
+
+
+def make_ecr(image_ids, manifests=None):
+    ecr = mock.Mock()
+    ecr.get_paginator.return_value = Paginator([{"imageIds": image_ids}])
+    manifests = manifests or {}
+
+    def batch_get_image(repositoryName, imageIds, acceptedMediaTypes):
+        images = []
+        for image_id in imageIds:
+            tag = image_id.get("imageTag")
+            if tag in manifests:
+                digest, manifest = manifests[tag]
+                images.append({
+                    "imageId": {"imageTag": tag, "imageDigest": digest},
+                    "imageManifest": json.dumps(manifest),
+                })
+        return {"images": images, "failures": []}
+
+    ecr.batch_get_image.side_effect = batch_get_image
+    ecr.batch_delete_image.return_value = {"failures": []}
+    return ecr
+
+
+def make_ecs(running_revision=None, task_images=None):
+    """
+    Fakes ECS with task definition revisions 9-15. Revision N uses image tag v{N-10} unless
+    `task_images` maps it to another image. Without `running_revision` no service is running.
+    """
+    task_images = task_images or {}
+    ecs = mock.Mock()
+    services = []
+    if running_revision is not None:
+        services = [{"deployments": [{"taskDefinition": f"arn:td/dev-frontend-task:{running_revision}"}]}]
+    ecs.describe_services.return_value = {"services": services}
+
+    def describe_task_definition(taskDefinition):
+        revision = int(taskDefinition.rsplit(":", 1)[1])
+        image = task_images.get(revision, f"{REGISTRY}/dev-frontend-ecr:v{revision - 10}")
+        return {"taskDefinition": {
+            "revision": revision,
+            "containerDefinitions": [{"image": image}, {"image": "prom/prometheus:latest"}],
+        }}
+
+    ecs.describe_task_definition.side_effect = describe_task_definition
+    ecs.get_paginator.return_value = Paginator([
+        {"taskDefinitionArns": [f"arn:td/dev-frontend-task:{r}" for r in range(9, 16)]}
+    ])
+    return ecs
+
+
+@pytest.fixture
+def run_gc(tmp_path, monkeypatch):
+    versionjson = tmp_path / "version.json"
+    versionjson.write_text(json.dumps({"latest_version": "v5", "history": HISTORY}))
+    monkeypatch.setattr(gc, "versionjson_path", versionjson)
+    monkeypatch.chdir(tmp_path)
+
+    def run(ecs, ecr, *args):
+        session = mock.Mock()
+        session.client.side_effect = lambda name: {"ecs": ecs, "ecr": ecr}[name]
+        with mock.patch("boto3.Session", return_value=session):
+            result = CliRunner().invoke(gc.gc_command, list(args))
+        assert result.exception is None, result.output
+        return result, json.loads(versionjson.read_text())["history"]
+
+    return run
+
+
+def test_select_kept_history():
+    assert select_kept_history(HISTORY, 2) == HISTORY[-2:]
+    assert select_kept_history(HISTORY, 2, extra_revisions={11}) == [HISTORY[0]] + HISTORY[-2:]
+    assert select_kept_history(HISTORY, 1, extra_tags={"v3"}) == [HISTORY[2], HISTORY[4]]
+
+
+def test_untagged_children_of_kept_index_are_not_stale():
+    index = {"manifests": [{"digest": "sha256:amd64"}, {"digest": "sha256:attestation"}]}
+    ecr = make_ecr(
+        [
+            {"imageDigest": "sha256:index", "imageTag": "v5"},
+            {"imageDigest": "sha256:amd64"},
+            {"imageDigest": "sha256:attestation"},
+            {"imageDigest": "sha256:orphan"},
+            {"imageDigest": "sha256:old", "imageTag": "v1"},
+        ],
+        manifests={"v5": ("sha256:index", index)},
+    )
+
+    keep_digests = get_kept_digests(ecr, "dev-frontend-ecr", {"v5"})
+    stale = list_stale_images(ecr, "dev-frontend-ecr", {"v5"}, keep_digests)
+
+    assert keep_digests == {"sha256:index", "sha256:amd64", "sha256:attestation"}
+    assert stale == [{"imageDigest": "sha256:orphan"}, {"imageDigest": "sha256:old", "imageTag": "v1"}]
+
+
+def test_gc_keeps_recent_and_running(run_gc):
+    ecs = make_ecs(running_revision=11)
+    ecr = make_ecr([{"imageDigest": f"sha256:{i}", "imageTag": f"v{i}"} for i in range(1, 6)])
+
+    result, history = run_gc(ecs, ecr, "--keep", "2")
+
+    deregistered = {c.kwargs["taskDefinition"] for c in ecs.deregister_task_definition.call_args_list}
+    assert deregistered == {f"arn:td/dev-frontend-task:{r}" for r in (9, 10, 12, 13)}
+    deleted = ecr.batch_delete_image.call_args.kwargs["imageIds"]
+    assert {image_id["imageTag"] for image_id in deleted} == {"v2", "v3"}
+    assert [entry["version"] for entry in history] == ["v1", "v4", "v5"]
+    assert "Garbage collection complete" in result.output
+
+
+def test_gc_dry_run_changes_nothing(run_gc):
+    ecs = make_ecs(running_revision=15)
+    ecr = make_ecr([{"imageDigest": "sha256:1", "imageTag": "v1"}])
+
+    result, history = run_gc(ecs, ecr, "--keep", "1", "--dry-run")
+
+    ecs.deregister_task_definition.assert_not_called()
+    ecr.batch_delete_image.assert_not_called()
+    assert history == HISTORY
+    assert "[dry-run] deregister arn:td/dev-frontend-task:11" in result.output
+
+
+def test_gc_keeps_history_for_failed_removals(run_gc):
+    ecs = make_ecs(running_revision=15)
+
+    def deregister(taskDefinition):
+        if taskDefinition.endswith(":12"):
+            raise RuntimeError("throttled")
+        return {}
+
+    ecs.deregister_task_definition.side_effect = deregister
+    ecr = make_ecr([{"imageDigest": f"sha256:{i}", "imageTag": f"v{i}"} for i in range(1, 6)])
+    ecr.batch_delete_image.return_value = {"failures": [
+        {"imageId": {"imageDigest": "sha256:3", "imageTag": "v3"}, "failureReason": "denied"}
+    ]}
+
+    result, history = run_gc(ecs, ecr, "--keep", "1")
+
+    assert [entry["version"] for entry in history] == ["v2", "v3", "v5"]
+    assert "finished with errors" in result.output
+
+
+def test_gc_keeps_older_digests_of_a_redeployed_tag(run_gc, tmp_path):
+    history = [
+        {"version": "1", "revision": 11, "image_digest": "sha256:one"},
+        {"version": "2", "revision": 12, "image_digest": "sha256:two-old"},
+        {"version": "2", "revision": 13, "image_digest": "sha256:two-new"},
+    ]
+    (tmp_path / "version.json").write_text(json.dumps({"history": history}))
+    ecs = make_ecs(running_revision=13)
+    ecr = make_ecr([
+        {"imageDigest": "sha256:one", "imageTag": "1"},
+        # the redeploy moved tag '2' to the new digest
+        {"imageDigest": "sha256:two-old"},
+        {"imageDigest": "sha256:two-new", "imageTag": "2"},
+    ])
+
+    result, kept = run_gc(ecs, ecr, "--keep", "2")
+
+    assert kept == history[1:]
+    deleted = ecr.batch_delete_image.call_args.kwargs["imageIds"]
+    assert deleted == [{"imageDigest": "sha256:one", "imageTag": "1"}]
+
+
+def test_gc_resolves_digests_of_entries_recorded_without_one(run_gc, tmp_path):
+    history = [
+        {"version": "2", "revision": 12},
+        {"version": "2", "revision": 13, "image_digest": "sha256:two-new"},
+    ]
+    (tmp_path / "version.json").write_text(json.dumps({"history": history}))
+    ecs = make_ecs(task_images={12: f"{REGISTRY}/dev-frontend-ecr@sha256:two-old"})
+    ecr = make_ecr([
+        {"imageDigest": "sha256:two-old"},
+        {"imageDigest": "sha256:two-new", "imageTag": "2"},
+    ])
+
+    result, kept = run_gc(ecs, ecr, "--keep", "2")
+
+    ecs.describe_task_definition.assert_called_once_with(taskDefinition="dev-frontend-task:12")
+    ecr.batch_delete_image.assert_not_called()
+    assert "0 ECR image(s) to delete" in result.output
+
+
+def test_gc_keeps_journaled_revision_and_image(run_gc, tmp_path):
+    journal = new_journal("v5", "src")
+    complete_phase(journal, "build", image_id="sha256:imageid", image_report=None)
+    complete_phase(journal, "push", image_digest="sha256:pushed")
+    complete_phase(journal, "register", task_def_arn="arn:td/dev-frontend-task:15", revision=15)
+    (tmp_path / "version.json").write_text(json.dumps({"history": HISTORY[:4]}))
+    ecs = make_ecs()
+    ecr = make_ecr([
+        {"imageDigest": "sha256:3", "imageTag": "v3"},
+        {"imageDigest": "sha256:4", "imageTag": "v4"},
+        {"imageDigest": "sha256:pushed", "imageTag": "v5"},
+    ])
+
+    result, history = run_gc(ecs, ecr, "--keep", "1")
+
+    deregistered = {c.kwargs["taskDefinition"] for c in ecs.deregister_task_definition.call_args_list}
+    assert deregistered == {f"arn:td/dev-frontend-task:{r}" for r in (9, 10, 11, 12, 13)}
+    deleted = ecr.batch_delete_image.call_args.kwargs["imageIds"]
+    assert deleted == [{"imageDigest": "sha256:3", "imageTag": "v3"}]
+    assert history == HISTORY[3:4]
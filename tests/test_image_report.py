@@ -0,0 +1,80 @@
+import json
+from click.testing import CliRunner
+
+from cli import image_report
+from cli.image_report import analyze_image, check_image_budget, previous_image_report
+
+MB = 1024 * 1024
+
+
+def test_analyze_image_uses_metadata_only_by_default(fake_docker):
+    report = analyze_image("app:v1")
+
+    assert report["size"] == 50 * MB
+    # oldest layer first
+    assert [layer["created_by"] for layer in report["layers"]] == ["FROM nginx:alpine", "COPY . ."]
+    assert [layer["size"] for layer in report["layers"]] == [1000, 300]
+    assert report["largest_files"] == []
+    assert not any(call.startswith("save") for call in fake_docker.calls)
+
+
+def test_analyze_image_largest_files(fake_docker):
+    fake_docker.set_layers([
+        {"./bin/busybox": b"b" * 500},
+        {"./app/bundle.js": b"j" * 4000, "./app/index.html": b"h" * 20},
+    ])
+
+    report = analyze_image("app:v1", largest_files=True)
+
+    assert report["largest_files"] == [
+        {"path": "/app/bundle.js", "size": 4000},
+        {"path": "/bin/busybox", "size": 500},
+        {"path": "/app/index.html", "size": 20},
+    ]
+
+
+def test_check_image_budget_within_limits():
+    report = {"size": 100 * MB}
+    assert check_image_budget(report, {"size": 95 * MB}, 500, 20) == []
+
+
+def test_check_image_budget_absolute_and_growth():
+    violations = check_image_budget({"size": 600 * MB}, {"size": 300 * MB}, 500, 20)
+
+    assert len(violations) == 2
+    assert "budget is 500 MB" in violations[0]
+    assert "grew 100.0%" in violations[1]
+
+
+def test_check_image_budget_without_previous_version():
+    assert check_image_budget({"size": 600 * MB}, None, None, 20) == []
+
+
+def test_previous_image_report_skips_entries_without_data():
+    history = [
+        {"version": "v1", "revision": 1, "image": {"size": 1}},
+        {"version": "v2", "revision": 2},
+    ]
+    assert previous_image_report(history) == {"size": 1}
+
+
+def test_image_report_command_trend(tmp_path, monkeypatch):
+    versionjson = tmp_path / "version.json"
+    versionjson.write_text(json.dumps({"history": [
+        {"version": "v1", "revision": 1},
+        {"version": "v2", "revision": 2, "image": {"size": 100 * MB, "layers": [], "largest_files": []}},
+        {"version": "v3", "revision": 3, "image": {
+            "size": 130 * MB,
+            "layers": [{"size": 30 * MB, "created_by": "COPY . ."}],
+            "largest_files": [{"path": "/app/bundle.js", "size": 29 * MB}],
+        }},
+    ]}))
+    monkeypatch.setattr(image_report, "versionjson_path", versionjson)
+
+    result = CliRunner().invoke(image_report.image_report_command, ["v3"])
+
+    assert result.exit_code == 0
+    assert "v1         (no image data)" in result.output
+    assert "(+30.0%)" in result.output
+    assert "COPY . ." in result.output
+    assert "/app/bundle.js" in result.output
@@ -0,0 +1,64 @@
+import os
+import pytest
+
+from cli.journal import (
+    complete_phase, journal_path, last_completed_phase, load_journal, new_journal, source_fingerprint
+)
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "index.html").write_text("<h1>hi</h1>")
+    monkeypatch.chdir(root)
+    return root
+
+
+def test_complete_phase_round_trip(project):
+    journal = new_journal("v1", "abc")
+    complete_phase(journal, "build", image_id="sha256:1", image_report=None)
+    complete_phase(journal, "push", image_digest="sha256:2")
+
+    loaded = load_journal()
+    assert loaded == journal
+    assert last_completed_phase(loaded) == "push"
+    assert not list(journal_path().parent.glob("*.tmp"))
+
+
+def test_journal_is_outside_the_project(project):
+    complete_phase(new_journal("v1", "abc"), "build", image_id="sha256:1", image_report=None)
+    assert not journal_path().is_relative_to(project)
+
+
+def test_truncated_journal_is_ignored(project, capsys):
+    journal_path().parent.mkdir(parents=True)
+    journal_path().write_text('{"version": "v1", "phases": {"bui')
+
+    assert load_journal() is None
+    assert "Ignoring unreadable deploy journal" in capsys.readouterr().out
+
+
+def test_fingerprint_changes_with_sources(project):
+    before = source_fingerprint()
+    (project / "app.js").write_text("console.log(1)")
+    assert source_fingerprint() != before
+
+
+def test_fingerprint_honours_dockerignore(project):
+    (project / ".dockerignore").write_text("dist\n*.log\n!keep.log\n")
+    before = source_fingerprint()
+
+    (project / "dist").mkdir()
+    (project / "dist" / "bundle.js").write_text("built")
+    (project / "debug.log").write_text("noise")
+    assert source_fingerprint() == before
+
+    (project / "keep.log").write_text("shipped")
+    assert source_fingerprint() != before
+
+
+def test_fingerprint_skips_unreadable_entries(project):
+    os.symlink(project / "missing", project / "dangling")
+    os.mkfifo(project / "pipe")
+    assert source_fingerprint()